@@ -0,0 +1,134 @@
+# Created by Yossy on 2025/07/05
+
+from pathlib import Path
+import importlib.util
+import numpy as np
+import pandas as pd
+
+from utils import Entry, Match
+
+
+# Parquet export needs an engine which isn't installed by install_packages.py
+PARQUET_ENGINES = ['pyarrow', 'fastparquet']
+
+
+def parquet_available():
+    "Return True if a parquet engine can be imported"
+    return any(importlib.util.find_spec(x) is not None for x in PARQUET_ENGINES)
+
+
+STATS_FORMATS = ['csv'] + (['parquet'] if parquet_available() else [])
+
+
+def player_label(entry: Entry):
+    "Return the short player label used in the statistics tables"
+    return '{}: {}'.format(entry.number, entry.name)
+
+
+def match_frame(matches: list[Match]):
+    "Return the match history as a DataFrame object (one row per match)"
+    return pd.DataFrame({
+        'player1': [player_label(m.entry1) for m in matches],
+        'player2': [player_label(m.entry2) for m in matches],
+        'score1': np.array([m.score1 for m in matches], dtype=int),
+        'score2': np.array([m.score2 for m in matches], dtype=int),
+        'timestamp': pd.to_datetime([m.timestamp for m in matches]),
+        'maps': [m.maps for m in matches],
+    })
+
+
+def _player_labels(df, entries=None):
+    "Return the player labels of the entries, or the players found in the match history"
+    if entries is not None:
+        return [player_label(e) for e in entries]
+    return sorted(set(df['player1']) | set(df['player2']))
+
+
+def standings(df, entries=None):
+    "Return the standings per player, sorted by wins, game differential and games won"
+    # Stack the matches from the view of each player
+    games_won = np.concatenate([df['score1'].to_numpy(), df['score2'].to_numpy()])
+    games_lost = np.concatenate([df['score2'].to_numpy(), df['score1'].to_numpy()])
+    result = np.sign(games_won - games_lost)
+    stacked = pd.DataFrame({
+        'player': np.concatenate([df['player1'].to_numpy(), df['player2'].to_numpy()]),
+        'wins': result > 0,
+        'losses': result < 0,
+        'draws': result == 0,
+        'games_won': games_won,
+        'games_lost': games_lost,
+    })
+    table = stacked.groupby('player').agg(
+        matches=('wins', 'size'),
+        wins=('wins', 'sum'),
+        losses=('losses', 'sum'),
+        draws=('draws', 'sum'),
+        games_won=('games_won', 'sum'),
+        games_lost=('games_lost', 'sum'),
+    )
+    # Include the players who haven't played yet
+    table = table.reindex(_player_labels(df, entries), fill_value=0).astype(int)
+    table['game_diff'] = table['games_won'] - table['games_lost']
+    table['win_rate'] = (table['wins'] / table['matches'].replace(0, np.nan)).fillna(0).round(3)
+    table = table.sort_values(['wins', 'game_diff', 'games_won'], ascending=False, kind='stable')
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    table.index.name = 'player'
+    return table
+
+
+def head_to_head(df, entries=None):
+    "Return # of match wins of each player (row) against each opponent (column)"
+    labels = _player_labels(df, entries)
+    player1 = pd.Categorical(df['player1'], categories=labels).codes
+    player2 = pd.Categorical(df['player2'], categories=labels).codes
+    score1 = df['score1'].to_numpy()
+    score2 = df['score2'].to_numpy()
+    # Ignore players who are not in the entries
+    valid = (player1 >= 0) & (player2 >= 0)
+
+    table = np.zeros((len(labels), len(labels)), dtype=int)
+    win1 = valid & (score1 > score2)
+    win2 = valid & (score2 > score1)
+    np.add.at(table, (player1[win1], player2[win1]), 1)
+    np.add.at(table, (player2[win2], player1[win2]), 1)
+    return pd.DataFrame(table, index=labels, columns=labels)
+
+
+def map_stats(df):
+    "Return # of matches each map was selected in"
+    maps = df['maps'].explode().dropna()
+    table = maps.value_counts().rename('picks').to_frame()
+    table['pick_rate'] = (table['picks'] / max(len(df), 1)).round(3)
+    table.index.name = 'map'
+    return table
+
+
+def compute_stats(matches: list[Match], entries=None):
+    "Return all the statistics tables as a dict of DataFrame objects"
+    df = match_frame(matches)
+    return {
+        'standings': standings(df, entries),
+        'head_to_head': head_to_head(df, entries),
+        'maps': map_stats(df),
+    }
+
+
+def export_stats(stats: dict, dirpath, fmt='csv'):
+    """
+    Export the statistics tables to files in the directory.
+    Parquet export requires pyarrow (or fastparquet), so it's only in STATS_FORMATS if installed.
+    Return the list of exported file paths.
+    """
+    if fmt not in STATS_FORMATS:
+        raise ValueError('Unsupported format {}: Choose from {}'.format(fmt, STATS_FORMATS))
+    dirpath = Path(dirpath)
+    dirpath.mkdir(parents=True, exist_ok=True)
+    fpaths = []
+    for name, table in stats.items():
+        fpath = dirpath / '{}.{}'.format(name, fmt)
+        if fmt == 'csv':
+            table.to_csv(fpath, encoding='utf-8-sig')
+        else:
+            table.to_parquet(fpath)
+        fpaths.append(fpath)
+    return fpaths
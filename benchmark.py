@@ -0,0 +1,324 @@
+# Created by Yossy on 2025/06/21
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from PIL import Image
+
+import utils
+from utils import IMAGE_SIZE, Match, MatchCoordinator, MatchInfoWriter
+from utils import parse_entries, save_image, normalize_images
+from analytics import compute_stats
+import generate_obs_config as obs_config
+
+
+REPO_DIR = Path(__file__).resolve().parent
+BASELINE_FILE = REPO_DIR / 'benchmark_baseline.json'
+
+SIZE_4K = 3840, 2160
+REPEAT = 5
+
+# A benchmark fails the check if it takes longer than baseline * max slowdown
+DEFAULT_MAX_SLOWDOWN = 1.5
+
+# Size of the synthetic fixtures
+SCALES = {
+    'small': {'entries': 8, 'matches': 50, 'template_copies': 1},
+    'default': {'entries': 32, 'matches': 500, 'template_copies': 30},
+}
+
+
+def make_image(fpath, size=SIZE_4K):
+    "Create a synthetic image with some detail so that it doesn't compress to nothing"
+    image = Image.linear_gradient('L').resize(size).convert('RGB')
+    image.save(fpath)
+    return fpath
+
+
+def timeit(func, repeat=REPEAT, setup=None):
+    "Return the best time of the given function in milliseconds"
+    best = float('inf')
+    for i in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def clear_image_cache():
+    "Clear the shared image cache so that the images are decoded again"
+    utils._load_image_cached.cache_clear()
+    utils._load_card_layer.cache_clear()
+
+
+@contextmanager
+def work_dir(names=('resources', 'outputs')):
+    "Run in a temporary copy of the app files so that the repository files are not modified"
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name in names:
+            shutil.copytree(REPO_DIR / name, Path(tmpdir) / name)
+        shutil.copyfile(REPO_DIR / 'obsfilepaths.json', Path(tmpdir) / 'obsfilepaths.json')
+        os.chdir(tmpdir)
+        try:
+            yield Path(tmpdir)
+        finally:
+            os.chdir(cwd)
+
+
+def make_tournament(dirpath, entry_count):
+    """
+    Create a tournament directory with the given # of entries.
+    Entry 1 and 2 have 4K AC images (PNG and JPEG), which are not normalized yet.
+    """
+    dirpath = Path(dirpath)
+    os.makedirs(dirpath / 'AC')
+    with open(dirpath / 'entries.csv', 'w', encoding='utf-8-sig', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Entry#', 'Check-In', 'Name', 'EN Name', 'Region', 'Comment'])
+        for i in range(1, entry_count + 1):
+            writer.writerow([i, 1, 'Player {}'.format(i), 'Player {}'.format(i), 'NA', 'Comment {}'.format(i)])
+    make_image(dirpath / 'AC' / '01.png')
+    make_image(dirpath / 'AC' / '02.jpg')
+    shutil.copytree(REPO_DIR / 'main' / 'maps', dirpath / 'maps')
+    return dirpath
+
+
+def make_match_log(fpath, entries, match_count):
+    "Create a match log with the given # of random matches"
+    random.seed(0)
+    mc = MatchCoordinator(entries)
+    maps = [os.path.splitext(m)[0] for m in os.listdir(REPO_DIR / 'main' / 'maps')]
+    start = datetime(2025, 1, 1)
+    for i in range(match_count):
+        entry1, entry2 = random.sample(entries, 2)
+        match = Match(entry1, entry2, random.randint(0, 2), random.randint(0, 2),
+                      start + timedelta(minutes=10 * i), random.sample(maps, 3))
+        mc.write_match_logfile(match, fpath)
+    # The ratings are rebuilt from the log when it's loaded
+    os.remove(utils.ratings_path(fpath))
+    return fpath
+
+
+def make_obs_template(fpath, copies):
+    "Create an OBS template with the sources of the bundled template repeated the given times"
+    with open(REPO_DIR / obs_config.DEFAULT_TEMPLATE, 'r', encoding='utf-8') as infile:
+        data = json.load(infile)
+    sources = data['sources']
+    data['sources'] = []
+    for i in range(copies + 1):
+        for source in sources:
+            source = json.loads(json.dumps(source))
+            if i != 0:
+                source['name'] = '{} ({})'.format(source['name'], i)
+            data['sources'].append(source)
+    with open(fpath, 'w', encoding='utf-8') as outfile:
+        json.dump(data, outfile, indent=4)
+    return fpath
+
+
+def update_obs_view(writer, entry1, entry2, maps, games_to_win=2):
+    "Same steps as the 'Update OBS View' button of controller.py"
+    writer.update_text('player1_text', entry1.name)
+    writer.update_text('player2_text', entry2.name)
+    writer.update_text('match_info_text', 'Round 1\n{}'.format(writer.get_best_of()))
+    writer.set_games_to_win(games_to_win)
+    writer.set_score(1, 0)
+    for i, entry in enumerate([entry1, entry2]):
+        writer.update_image('ac_player{}_image'.format(i+1), entry.image_path, source_type='ac')
+        writer.update_text('comment_player{}_text'.format(i+1), entry.comment)
+    for i in range(5):
+        map_path = Path('main') / 'maps' / (maps[i] + '.jpg') if i < len(maps) else utils.RESOURCES / 'images' / 'map_undefined.png'
+        writer.update_image('map{}_image'.format(i+1), map_path, source_type='map')
+        writer.update_text('map{}_text'.format(i+1), maps[i] if i < len(maps) else 'Undefined')
+
+
+def run_benchmarks(scale='default', repeat=REPEAT):
+    "Run the benchmarks on synthetic fixtures and return the best time of each in milliseconds"
+    params = SCALES[scale]
+    results = {}
+    with work_dir() as tmpdir:
+        tournament = make_tournament(tmpdir / 'main', params['entries'])
+        entries = parse_entries(tournament)
+        logfile = make_match_log(tournament / 'matchlog.txt', entries, params['matches'])
+        template = make_obs_template(tmpdir / 'template.json', params['template_copies'])
+        maps = [os.path.splitext(m)[0] for m in sorted(os.listdir(tournament / 'maps'))][:3]
+
+        # Update OBS View with 4K AC images decoded from scratch
+        writer = MatchInfoWriter()
+        results['update_obs_view'] = timeit(
+            lambda: update_obs_view(writer, entries[0], entries[1], maps), repeat, clear_image_cache)
+        # Same players again (decoded images are cached)
+        results['update_obs_view (cached)'] = timeit(
+            lambda: update_obs_view(writer, entries[0], entries[1], maps), repeat)
+        results['render_card'] = timeit(
+            lambda: writer.update_card(1, entries[0].name, entries[0].comment, entries[0].image_path, 1),
+            repeat, clear_image_cache)
+
+        # Match log
+        mc = MatchCoordinator(entries)
+        results['load_match_log'] = timeit(lambda: mc.load_match_logfile(logfile), repeat)
+
+        def _log_match():
+            match = Match(entries[0], entries[1], 1, 0)
+            mc.log_match(match)
+            mc.write_match_logfile(match, logfile)
+        results['log_match'] = timeit(_log_match, repeat)
+        results['suggest_match'] = timeit(mc.suggest_matchup, repeat)
+        results['match_stats'] = timeit(lambda: compute_stats(mc.matches, mc.entries), repeat)
+
+        # OBS config
+        results['generate_obs_config'] = timeit(
+            lambda: obs_config.generate_obs_config(template, force=True), repeat)
+        results['generate_obs_config (cached)'] = timeit(
+            lambda: obs_config.generate_obs_config(template), repeat)
+    return results
+
+
+def load_baseline(fpath=BASELINE_FILE):
+    if not os.path.isfile(fpath):
+        return None
+    with open(fpath, 'r', encoding='utf-8') as jsonfile:
+        return json.load(jsonfile)
+
+
+def save_baseline(results, scale, fpath=BASELINE_FILE):
+    with open(fpath, 'w', encoding='utf-8') as jsonfile:
+        json.dump({'scale': scale, 'results': results}, jsonfile, indent=4)
+
+
+def check_baseline(results, baseline, max_slowdown=DEFAULT_MAX_SLOWDOWN):
+    "Return the benchmarks slower than the baseline by more than max slowdown as {name: (msec, baseline msec)}"
+    regressions = {}
+    for name, msec in results.items():
+        base = baseline.get(name)
+        if base is not None and msec > base * max_slowdown:
+            regressions[name] = (msec, base)
+    return regressions
+
+
+def bench_images():
+    "Compare the full decode and the reduced decode of 4K images"
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        out = tmpdir / 'out.png'
+
+        def _full_decode(image_path):
+            # Original update_image implementation
+            image = Image.open(image_path)
+            image.thumbnail(IMAGE_SIZE, Image.Resampling.LANCZOS, None)
+            image.save(out)
+
+        for ext in ['jpg', 'png']:
+            src = make_image(tmpdir / '4k.{}'.format(ext))
+            results['full decode ({})'.format(ext)] = timeit(lambda: _full_decode(src))
+            results['reduced decode ({})'.format(ext)] = timeit(
+                lambda: save_image(src, out, source_type='ac'), setup=clear_image_cache)
+
+        # Normalized on ingest, then updated as it is
+        acdir = tmpdir / 'AC'
+        os.makedirs(acdir)
+        make_image(acdir / '01.png')
+        normalize_images(acdir)
+        results['normalized (png)'] = timeit(lambda: save_image(acdir / '01.png', out, source_type='ac'))
+    return results
+
+
+def bench_controller(match_count=200):
+    """
+    Return the rerun time of the controller per interaction.
+    (Streamlit's AppTest always reruns the whole script, including the fragments)
+    """
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    with work_dir(('main', 'resources', 'outputs')):
+        at = AppTest.from_file(str(REPO_DIR / 'controller.py'), default_timeout=60)
+        at.run()
+        mc = at.session_state.match_coordinator
+        random.seed(0)
+        for i in range(match_count):
+            entry1, entry2 = random.sample(mc.entries, 2)
+            mc.log_match(Match(entry1, entry2, 1, 0))
+        for toggle in at.toggle:
+            if toggle.label in ['Match Log Table', 'Standings']:
+                toggle.set_value(True)
+        at.run()
+
+        def _score_edit(i):
+            at.number_input(key='player1_score').set_value(i % 2)
+
+        def _map_edit(i):
+            selectbox = at.selectbox(key='map1')
+            selectbox.set_value(selectbox.options[1 + i % (len(selectbox.options) - 1)])
+
+        def _name_edit(i):
+            at.text_input[0].set_value('Player{}'.format(i))
+
+        for name, edit in [('score edit', _score_edit), ('map edit', _map_edit), ('name edit', _name_edit)]:
+            counter = iter(range(REPEAT))
+            results[name] = timeit(at.run, setup=lambda: edit(next(counter)))
+    return results
+
+
+def print_results(results, baseline=None):
+    for name, msec in results.items():
+        line = '{:<32}{:>10.1f} ms'.format(name, msec)
+        if baseline is not None and name in baseline:
+            line += '  ({:+.0%} vs. baseline)'.format(msec / baseline[name] - 1)
+        print(line)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Performance benchmarks of the update pipeline')
+    parser.add_argument('--scale', choices=list(SCALES.keys()), default='default')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--save-baseline', action='store_true', help='Save the results as the baseline')
+    parser.add_argument('--check', action='store_true', help='Fail if slower than the baseline')
+    parser.add_argument('--max-slowdown', type=float, default=DEFAULT_MAX_SLOWDOWN,
+                        help='Allowed ratio to the baseline time (default: {})'.format(DEFAULT_MAX_SLOWDOWN))
+    parser.add_argument('--images', action='store_true', help='Compare the image decode paths')
+    parser.add_argument('--controller', action='store_true', help='Measure the controller rerun time')
+    args = parser.parse_args(args)
+
+    if args.images:
+        print_results(bench_images())
+    if args.controller:
+        print_results(bench_controller())
+    if args.images or args.controller:
+        return 0
+
+    results = run_benchmarks(args.scale, args.repeat)
+    baseline = load_baseline()
+    if baseline is not None and baseline['scale'] != args.scale:
+        baseline = None
+    print_results(results, None if baseline is None else baseline['results'])
+
+    if args.save_baseline:
+        save_baseline(results, args.scale)
+        print('Saved the baseline: {}'.format(BASELINE_FILE))
+    elif args.check:
+        if baseline is None:
+            print('No baseline for the scale {}: Run with --save-baseline first.'.format(args.scale))
+            return 1
+        regressions = check_baseline(results, baseline['results'], args.max_slowdown)
+        for name, (msec, base) in regressions.items():
+            print('Regression: {} took {:.1f} ms (baseline {:.1f} ms)'.format(name, msec, base))
+        return 1 if len(regressions) != 0 else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
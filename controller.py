@@ -6,10 +6,9 @@ import random
 from datetime import datetime
 import shutil
 import streamlit as st
-from utils import MatchInfoWriter, MatchCoordinator, Match
-from utils import parse_entries, parse_comments, comments_to_entries
-
-_g = globals()
+from analytics import compute_stats, export_stats, STATS_FORMATS
+from utils import Match, Station, ratings_path, is_valid_station_name
+from utils import parse_entries, parse_comments, comments_to_entries, normalize_images, match_log_path
 
 ROUNDS = ['Round {}'.format(i) for i in range(1, 6)] + [
    "Semi-Final", "3rd Place Playoff", "Final", "Ground Final"
@@ -21,27 +20,53 @@ DEFAULT_SCORE = 0
 TOURNAMENT_DIR = Path('.') / 'main'
 UNDEFINED_MAP = Path('.') / 'resources' / 'allmaps' / 'Undefined.jpg'
 UNDEFINED_AC = Path('.') / 'resources' / 'images' / 'ac_undefined.png'
-MATCH_LOG_FILE = TOURNAMENT_DIR / 'matchlog.txt'
+AC_BACKUP_DIR = TOURNAMENT_DIR / 'AC_originals'
+
+# Station name given by the URL (e.g. http://localhost:8501/?station=B)
+# Without it, the controller writes to the default outputs directory.
+STATION = st.query_params.get('station')
+if STATION is not None and not is_valid_station_name(STATION):
+    st.error("Invalid station name '{}': Use letters, digits, '_' and '-' only.".format(STATION))
+    st.stop()
+MATCH_LOG_FILE = match_log_path(TOURNAMENT_DIR, STATION)
+STATS_DIR = TOURNAMENT_DIR / 'stats' if STATION is None else TOURNAMENT_DIR / 'stats' / STATION
 
 
-# Initialize MatchCoordinator instance
-if 'match_coordinator' not in st.session_state:
-    st.session_state.match_coordinator = MatchCoordinator([])
+@st.cache_resource
+def get_shared_state():
+    "Return the entries and stations shared by all the controller sessions in this process"
+    return {'entries': None, 'player_options': None, 'stations': {}}
+
+shared = get_shared_state()
 
 def load_entries():
     entries = [e for e in parse_entries(TOURNAMENT_DIR) if e.checkin]
+    shared['entries'] = entries
+    shared['player_options'] = [x.get_label() for x in entries]
     st.session_state.entries = entries
     st.session_state.entries_nums = [e.number for e in entries]
-    st.session_state.match_coordinator.update_entries(entries)
+    for station in shared['stations'].values():
+        station.match_coordinator.update_entries(entries)
+
+def get_station(name):
+    "Return the station, creating it on first use"
+    if name not in shared['stations']:
+        shared['stations'][name] = Station(name, shared['entries'], match_log_path(TOURNAMENT_DIR, name))
+    return shared['stations'][name]
 
 def load_maps():
     "Load map pool"
     st.session_state.map_names = [os.path.splitext(m)[0] for m in os.listdir(TOURNAMENT_DIR / 'maps')]
 
 # Load tournament entries
-if 'entries' not in st.session_state:
+if shared['entries'] is None:
     load_entries()
 
+station = get_station(STATION)
+st.session_state.match_coordinator = station.match_coordinator
+st.session_state.entries = shared['entries']
+st.session_state.entries_nums = [e.number for e in shared['entries']]
+
 if 'map_names' not in st.session_state:
     load_maps()
     
@@ -51,6 +76,12 @@ if 'player1_score' not in st.session_state:
 if 'player2_score' not in st.session_state:
     st.session_state.player2_score = DEFAULT_SCORE
 
+def cached(name, key, func):
+    "Return the result of func cached in the session while the key is unchanged"
+    if name not in st.session_state or st.session_state[name][0] != key:
+        st.session_state[name] = (key, func())
+    return st.session_state[name][1]
+
 def player_label_to_entry(label: str):
     "Return Entry instance from the player label in the platyer selection box"
     entry_num = int(label.split(':')[0])
@@ -58,8 +89,15 @@ def player_label_to_entry(label: str):
 
 
 st.title("AC6 Overlay Contol")
+if STATION is not None:
+    st.caption('Station: {}'.format(STATION))
 
-btn_col1, btn_col2 = st.columns([1, 1])
+# Prefer even matchups by the player ratings when suggesting a match
+st.session_state.match_coordinator.rating_weight = st.slider(
+    'Rating Weight', min_value=0.0, max_value=5.0, value=0.0, step=0.5,
+    help='Weight of the rating closeness in Suggest Match (0 to ignore ratings)')
+
+btn_col1, btn_col2, btn_col3 = st.columns([1, 1, 1])
 
 with btn_col1:
     # Reload Entry information
@@ -77,8 +115,17 @@ with btn_col2:
             st.session_state.player1 = entry1.get_label()
             st.session_state.player2 = entry2.get_label()
 
+with btn_col3:
+    # Shrink oversized AC images in place so that OBS updates don't decode them every time
+    # (The originals are kept in AC_originals)
+    if st.button('Normalize AC Images'):
+        normalized, skipped = normalize_images(TOURNAMENT_DIR / 'AC', source_type='ac', backup_dir=AC_BACKUP_DIR)
+        st.write('Normalized {} image(s)'.format(len(normalized)))
+        for fpath in skipped:
+            st.warning('AC image could not be processed: {}'.format(fpath))
+
 
-player_options = [x.get_label() for x in st.session_state.entries]
+player_options = shared['player_options']
 
 player1_selection = st.selectbox('Player 1', player_options, key='player1')
 p1name = player1_selection.split(':')[1].strip() if player1_selection else 'Undefined'
@@ -97,45 +144,60 @@ games_to_win = int((int(best_of[-1]) + 1) / 2)
 match_info = "{}\n{}".format(round, best_of)
 
 
-col1, col2, col3 = st.columns([1, 1, 1])
-
-with col1:
-    if st.button('Reset Score'):
-        st.session_state.player1_score = DEFAULT_SCORE
-        st.session_state.player2_score = DEFAULT_SCORE
-
-with col2:
-    placeholder1 = st.empty()
-    player1_score = placeholder1.number_input(
-        'Player 1 Score', min_value=0, max_value=games_to_win, step=1, key='player1_score')
-
-with col3:
-    placeholder2 = st.empty()
-    player2_score = placeholder2.number_input(
-        'Player 2 Score', min_value=0, max_value=games_to_win, step=1, key='player2_score')
-
-
-# Random map selection from the map pool
-if st.button('Random Selection'):
-    if st.session_state.map_names is None or len(st.session_state.map_names) == 0:
-        raise ValueError('Map Pool is empty.')
-    else:
-        map_pool = []
-        while len(map_pool) < game_num:
-            maps = st.session_state.map_names.copy()
-            random.shuffle(maps)
-            map_pool += maps
-            
-        for i in range(game_num):
-            st.session_state['map{}'.format(i+1)] = map_pool[i]
-
-# Show selected maps 
-map_options = ['Undefined'] + st.session_state.map_names
-for i in range(game_num):
-    map_var = 'map{}'.format(i+1)
-    _g[map_var] = st.selectbox('Map {}'.format(i+1), map_options, key=map_var) 
-
-writer = MatchInfoWriter()
+# Score and map edits only rerun their own section (fragment)
+@st.fragment
+def score_section(games_to_win):
+    col1, col2, col3 = st.columns([1, 1, 1])
+
+    with col1:
+        if st.button('Reset Score'):
+            st.session_state.player1_score = DEFAULT_SCORE
+            st.session_state.player2_score = DEFAULT_SCORE
+
+    with col2:
+        placeholder1 = st.empty()
+        placeholder1.number_input(
+            'Player 1 Score', min_value=0, max_value=games_to_win, step=1, key='player1_score')
+
+    with col3:
+        placeholder2 = st.empty()
+        placeholder2.number_input(
+            'Player 2 Score', min_value=0, max_value=games_to_win, step=1, key='player2_score')
+
+@st.fragment
+def map_section(game_num):
+    # Random map selection from the map pool
+    if st.button('Random Selection'):
+        if st.session_state.map_names is None or len(st.session_state.map_names) == 0:
+            raise ValueError('Map Pool is empty.')
+        else:
+            map_pool = []
+            while len(map_pool) < game_num:
+                maps = st.session_state.map_names.copy()
+                random.shuffle(maps)
+                map_pool += maps
+                
+            for i in range(game_num):
+                st.session_state['map{}'.format(i+1)] = map_pool[i]
+
+    # Show selected maps 
+    map_options = ['Undefined'] + st.session_state.map_names
+    for i in range(game_num):
+        map_var = 'map{}'.format(i+1)
+        st.selectbox('Map {}'.format(i+1), map_options, key=map_var) 
+
+score_section(games_to_win)
+map_section(game_num)
+
+# Read the values from the session state, which is up to date even after a fragment rerun
+player1_score = st.session_state.player1_score
+player2_score = st.session_state.player2_score
+selected_maps = [st.session_state['map{}'.format(i+1)] for i in range(game_num)]
+
+writer = station.writer
+writer.render_cards = st.toggle('Composited Card View',
+                                help='Render the card view of each player into one image (card_player1/2). '
+                                     'Use the scene collection generated from yossy_tournaments_v01_cards.json')
 
 col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
 
@@ -145,36 +207,45 @@ with col1:
         writer.update_text('player2_text', player2_name)
         writer.update_text('match_info_text', match_info)
 
-        writer.set_games_to_win(games_to_win)
-        writer.set_score(player1_score, player2_score)
+        if writer.render_cards:
+            # The stars are drawn on the cards, so the star images are left as they are
+            writer.games_to_win = games_to_win
+        else:
+            writer.set_games_to_win(games_to_win)
+            writer.set_score(player1_score, player2_score)
         entry_player1 = player_label_to_entry(player1_selection)
         entry_player2 = player_label_to_entry(player2_selection)
 
         # Update AC images & commnets of Card View
-        for i, entry in enumerate([entry_player1, entry_player2]):
+        players = zip([entry_player1, entry_player2], [player1_name, player2_name], [player1_score, player2_score])
+        for i, (entry, name, score) in enumerate(players):
             if os.path.isfile(entry.image_path):
                 ipath = entry.image_path
             else:
                 ipath = UNDEFINED_AC
-            writer.update_image('ac_player{}_image'.format(i+1), ipath, (1275, 713))
-            writer.update_text('comment_player{}_text'.format(i+1), entry.comment)
+            if writer.render_cards:
+                writer.update_card(i+1, name, entry.comment, ipath, score)
+            else:
+                writer.update_image('ac_player{}_image'.format(i+1), ipath, source_type='ac')
+                writer.update_text('comment_player{}_text'.format(i+1), entry.comment)
 
         # Update map images    
         for i in range(5):
             map_var = 'map{}'.format(i+1)
             map_path = UNDEFINED_MAP
             map_name = 'Undefined'
-            if i < game_num and _g[map_var] != 'Undefined':
-                map_path = TOURNAMENT_DIR / 'maps' / (_g[map_var] +'.jpg')
-                map_name = _g[map_var]
-            writer.update_image(map_var + '_image', map_path)
+            if i < game_num and selected_maps[i] != 'Undefined':
+                map_path = TOURNAMENT_DIR / 'maps' / (selected_maps[i] +'.jpg')
+                map_name = selected_maps[i]
+            writer.update_image(map_var + '_image', map_path, source_type='map')
             writer.update_text(map_var + '_text', map_name)
 
 with col2:
     if st.button('Log Match'):
         entry1 = player_label_to_entry(player1_selection)
         entry2 = player_label_to_entry(player2_selection)
-        match = Match(entry1, entry2, player1_score, player2_score)
+        match = Match(entry1, entry2, player1_score, player2_score,
+                      maps=[m for m in selected_maps if m != 'Undefined'])
         st.session_state.match_coordinator.log_match(match)
 
         # Add to log file
@@ -190,6 +261,8 @@ with col4:
         backup = os.path.splitext(MATCH_LOG_FILE)[0] + '_backup-{}.txt'.format(strdt)
         # backup the match log file
         shutil.move(MATCH_LOG_FILE, backup)
+        if os.path.isfile(ratings_path(MATCH_LOG_FILE)):
+            shutil.move(ratings_path(MATCH_LOG_FILE), ratings_path(backup))
         # reset matches
         st.session_state.match_coordinator.update_matches([])
     
@@ -206,5 +279,34 @@ for m in st.session_state.map_names:
 st.markdown(maps)
 
 
-if st.toggle("Match Log Table"):
-    st.table(st.session_state.match_coordinator.generate_table())
\ No newline at end of file
+# The tables are recalculated only when the entries or the matches change
+@st.fragment
+def match_log_section():
+    mc = st.session_state.match_coordinator
+    if st.toggle("Match Log Table"):
+        st.table(cached('match_table', (id(mc), mc.version, mc.rating_weight), mc.generate_table))
+
+@st.fragment
+def standings_section():
+    mc = st.session_state.match_coordinator
+    if st.toggle("Standings"):
+        stats = cached('stats', (id(mc), mc.version), lambda: compute_stats(mc.matches, mc.entries))
+        st.dataframe(stats['standings'])
+        st.markdown('Head-to-Head (wins of row player against column player)')
+        st.dataframe(stats['head_to_head'])
+        st.markdown('Map Picks')
+        st.dataframe(stats['maps'])
+
+        stats_col1, stats_col2 = st.columns([1, 1])
+        with stats_col1:
+            stats_format = st.selectbox('Format', STATS_FORMATS)
+        with stats_col2:
+            if st.button('Export Stats'):
+                try:
+                    fpaths = export_stats(stats, STATS_DIR, stats_format)
+                    st.write('Exported: {}'.format(', '.join([str(x) for x in fpaths])))
+                except ImportError as e:
+                    st.error('Could not export {}: {}'.format(stats_format, e))
+
+match_log_section()
+standings_section()
@@ -1,49 +1,152 @@
 # Created by Yossy on 2025/06/04
 
 from pathlib import Path
+import argparse
+from collections import namedtuple
+import hashlib
 import json
 import os
 
-from utils import OBSItems
+from utils import OBSItems, OBS_FILEPATHS, station_output_root
 
 
-DEFAULT_TEMPLATE = Path('obs_templates') / 'yossy_tournaments_v01.json'
+TEMPLATES_DIR = Path('obs_templates')
+DEFAULT_TEMPLATE = TEMPLATES_DIR / 'yossy_tournaments_v01.json'
 EXPORT_FILE = 'my_obs_config.json'
 FILE_KEYS = ['file', 'local_file']
 
+# Hash of the inputs and the referenced files of each exported config
+CACHE_FILE = '.obs_config_cache.json'
+
 OBS_ITEMS = OBSItems()
 
-def generate_obs_config(template=DEFAULT_TEMPLATE):
-    "Generate OBS config file from a template"
+ConfigResult = namedtuple('ConfigResult', ['export_file', 'missing_files', 'cached'])
+
+def export_file(station=None, template=DEFAULT_TEMPLATE):
+    "Return the export file path of the template and the station"
+    name, ext = os.path.splitext(EXPORT_FILE)
+    if Path(template) != DEFAULT_TEMPLATE:
+        name += '_' + Path(template).stem
+    if station is not None:
+        name += '_' + station
+    return name + ext
+
+def config_hash(template, station=None):
+    "Return the hash of everything the exported config depends on"
+    sha = hashlib.sha256()
+    for fpath in [template, OBS_FILEPATHS]:
+        with open(fpath, 'rb') as infile:
+            sha.update(infile.read())
+    sha.update(os.path.abspath('.').encode('utf-8'))
+    sha.update(str(station).encode('utf-8'))
+    return sha.hexdigest()
+
+def load_cache():
+    if not os.path.isfile(CACHE_FILE):
+        return {}
+    with open(CACHE_FILE, 'r', encoding='utf-8') as cachefile:
+        return json.load(cachefile)
+
+def save_cache(cache):
+    with open(CACHE_FILE, 'w', encoding='utf-8') as cachefile:
+        json.dump(cache, cachefile, indent=4)
+
+def cached_result(cache, template, station, digest):
+    "Return the result of the previous export if nothing has changed since then"
+    fpath = export_file(station, template)
+    hit = cache.get(fpath)
+    if hit is None or hit['hash'] != digest or not os.path.isfile(fpath):
+        return None
+    missing_files = [x for x in hit['files'] if not os.path.exists(x)]
+    return ConfigResult(fpath, missing_files, True)
+
+def _generate(template, station, export_path):
+    "Generate OBS config file from a template to the export path. Return the referenced files"
 
-    # Load OBS config template file 
-    data = json.load(open(template, 'r', encoding='utf-8'))
+    # Load OBS config template file
+    with open(template, 'r', encoding='utf-8') as infile:
+        data = json.load(infile)
 
     # Update file paths
-    update_file_paths(data)
+    obsitems = OBSItems(station_output_root(station))
+    unresolved = update_file_paths(data, obsitems)
+    if len(unresolved) != 0:
+        raise ValueError("Keys in {} don't exist in the OBS items: {}".format(template, unresolved))
 
     # Export
-    with open(EXPORT_FILE, 'w', encoding='utf-8') as outfile:
+    with open(export_path, 'w', encoding='utf-8') as outfile:
         json.dump(data, outfile, indent=4)
-        
-def update_file_paths(data):
-    for file_key in FILE_KEYS:
-        if issubclass(data.__class__, dict):
-            for key in data.keys():
-                if key == file_key and data[key].startswith('$'):
-                    # Update path
-                    item_key = data[key].lstrip('$')
-                    abspath = os.path.abspath(OBS_ITEMS.key_to_item(item_key)['relative_path'])
-                    data[key] = abspath
-                    print("Updated path: {} > {}".format(item_key, abspath))
-
-                # Recursive process
-                update_file_paths(data[key])
-
-        if issubclass(data.__class__, list):
-            for item in data:
-                # Recursive process
-                update_file_paths(item)
+    return sorted(set(node[key] for node, key in file_references(data, prefix='')))
+
+def generate_obs_config(template=DEFAULT_TEMPLATE, station=None, force=False):
+    """
+    Generate OBS config file from a template.
+    Skip it if the template, obsfilepaths.json and the install path haven't changed.
+    """
+    cache = load_cache()
+    digest = config_hash(template, station)
+    result = None if force else cached_result(cache, template, station, digest)
+    if result is None:
+        fpath = export_file(station, template)
+        files = _generate(template, station, fpath)
+        result = ConfigResult(fpath, [x for x in files if not os.path.exists(x)], False)
+        cache[result.export_file] = {'hash': digest, 'files': files}
+        save_cache(cache)
+    for fpath in result.missing_files:
+        print("File not found: {}".format(fpath))
+    return result
+
+def generate_obs_configs(templates=None, station=None, force=False):
+    "Generate OBS config files from the templates (all in obs_templates by default)"
+    if templates is None:
+        templates = sorted(TEMPLATES_DIR.glob('*.json'))
+    cache = load_cache()
+    digests = [config_hash(t, station) for t in templates]
+    results = [None if force else cached_result(cache, t, station, d) for t, d in zip(templates, digests)]
+
+    # Generate only the configs which need to be updated
+    # (Each takes a few ms, so worker processes would only add startup overhead)
+    stale = [i for i, result in enumerate(results) if result is None]
+    for i in stale:
+        fpath = export_file(station, templates[i])
+        files = _generate(templates[i], station, fpath)
+        results[i] = ConfigResult(fpath, [x for x in files if not os.path.exists(x)], False)
+        cache[fpath] = {'hash': digests[i], 'files': files}
+    if len(stale) != 0:
+        save_cache(cache)
+
+    for result in results:
+        for fpath in result.missing_files:
+            print("File not found in {}: {}".format(result.export_file, fpath))
+    return results
+
+def file_references(data, prefix='$'):
+    "Return the file paths in the data starting with the prefix as (container, key) pairs"
+    references = []
+    stack = [data]
+    while len(stack) != 0:
+        node = stack.pop()
+        if issubclass(node.__class__, dict):
+            for key, value in node.items():
+                if key in FILE_KEYS and issubclass(value.__class__, str) and value != '' and value.startswith(prefix):
+                    references.append((node, key))
+                elif issubclass(value.__class__, (dict, list)):
+                    stack.append(value)
+        elif issubclass(node.__class__, list):
+            stack.extend(node)
+    return references
+
+def update_file_paths(data, obsitems=OBS_ITEMS):
+    "Replace '$key' file paths with the absolute paths. Return the keys which couldn't be resolved"
+    items = {item['key']: item for item in obsitems.values()}
+    unresolved = []
+    for node, key in file_references(data):
+        item_key = node[key].lstrip('$')
+        if item_key in items:
+            node[key] = os.path.abspath(items[item_key]['relative_path'])
+        else:
+            unresolved.append(item_key)
+    return unresolved
 
 
 def find_key(data, file_key):
@@ -57,5 +160,14 @@ def find_key(data, file_key):
             find_key(item, file_key)
 
 if __name__ == '__main__':
-    generate_obs_config()
+    parser = argparse.ArgumentParser(description='Generate OBS config files from templates')
+    parser.add_argument('templates', nargs='*', help='Template files (default: {})'.format(DEFAULT_TEMPLATE))
+    parser.add_argument('--all', action='store_true', help='Generate all the templates in {}'.format(TEMPLATES_DIR))
+    parser.add_argument('--station', help='Station name in multi-station mode')
+    parser.add_argument('--force', action='store_true', help='Generate even if nothing has changed')
+    args = parser.parse_args()
 
+    if args.all:
+        generate_obs_configs(station=args.station, force=args.force)
+    else:
+        generate_obs_configs(args.templates or [DEFAULT_TEMPLATE], station=args.station, force=args.force)
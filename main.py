@@ -5,7 +5,8 @@ import sys
 import os
 from PySide6 import QtCore, QtWidgets, QtGui
 
-from generate_obs_config import generate_obs_config
+from generate_obs_config import generate_obs_configs
+from utils import is_valid_station_name
 
 PYTHON = 'python'
 VENV = '.venv\\Scripts\\python.exe'
@@ -22,10 +23,13 @@ class MainWidget(QtWidgets.QWidget):
         self.button_start = QtWidgets.QPushButton('Start')
         self.button_stop = QtWidgets.QPushButton('Stop')
         self.button_generate_obsconfig = QtWidgets.QPushButton('Generate OBS Config')
+        self.station_edit = QtWidgets.QLineEdit()
+        self.station_edit.setPlaceholderText('Station (optional)')
 
         layout = QtWidgets.QHBoxLayout(self)
         layout.addWidget(self.button_start)
         layout.addWidget(self.button_stop)
+        layout.addWidget(self.station_edit)
         layout.addWidget(self.button_generate_obsconfig)
 
         # Setup connections 
@@ -45,8 +49,25 @@ class MainWidget(QtWidgets.QWidget):
 
     @QtCore.Slot()
     def generate_obs_config(self):
-        "Generate OBS config from a template"
-        generate_obs_config()
+        "Generate OBS configs from the templates (for the station if given)"
+        station = self.station_edit.text().strip() or None
+        if station is not None and not is_valid_station_name(station):
+            QtWidgets.QMessageBox.warning(
+                self, 'Invalid Station', "Use letters, digits, '_' and '-' only for the station name.")
+            return
+        try:
+            results = generate_obs_configs(station=station)
+        except (ValueError, OSError) as e:
+            # e.g. '$keys' in a template which don't exist in obsfilepaths.json
+            QtWidgets.QMessageBox.warning(self, 'OBS Config Error', str(e))
+            return
+        missing_files = ['{}: {}'.format(r.export_file, x) for r in results for x in r.missing_files]
+        if len(missing_files) != 0:
+            QtWidgets.QMessageBox.warning(
+                self, 'Missing Files', 'Files referenced by the OBS configs not found:\n' + '\n'.join(missing_files))
+        else:
+            QtWidgets.QMessageBox.information(
+                self, 'OBS Config', 'Exported:\n' + '\n'.join(r.export_file for r in results))
 
 
 def run_application():
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import analytics
+from utils import Entry, Match
+from analytics import compute_stats, export_stats, parquet_available
+
+
+def test_compute_stats(tmp_path):
+    entries = [Entry(number=i+1, name=name) for i, name in enumerate(['Yossy', 'P1', 'P2', 'P3'])]
+    matches = [
+        Match(entries[0], entries[1], 2, 1, maps=['LOC Station 31', 'Xylem, the Floating City']),
+        Match(entries[1], entries[2], 2, 0, maps=['LOC Station 31']),
+        Match(entries[2], entries[0], 2, 0),
+        Match(entries[0], entries[1], 1, 1),
+    ]
+    stats = compute_stats(matches, entries)
+
+    standings = stats['standings']
+    assert list(standings.index) == ['2: P1', '3: P2', '1: Yossy', '4: P3']
+    assert list(standings['rank']) == [1, 2, 3, 4]
+    yossy = standings.loc['1: Yossy']
+    assert (yossy['matches'], yossy['wins'], yossy['losses'], yossy['draws']) == (3, 1, 1, 1)
+    assert (yossy['games_won'], yossy['games_lost'], yossy['game_diff']) == (3, 4, -1)
+    assert yossy['win_rate'] == 0.333
+    assert standings.loc['4: P3', 'matches'] == 0
+
+    h2h = stats['head_to_head']
+    assert h2h.loc['1: Yossy', '2: P1'] == 1
+    assert h2h.loc['2: P1', '1: Yossy'] == 0
+    assert h2h.loc['3: P2', '1: Yossy'] == 1
+    assert np.trace(h2h.to_numpy()) == 0
+
+    assert stats['maps'].loc['LOC Station 31', 'picks'] == 2
+    assert stats['maps'].loc['Xylem, the Floating City', 'picks'] == 1
+
+    fpaths = export_stats(stats, tmp_path, 'csv')
+    assert [f.name for f in fpaths] == ['standings.csv', 'head_to_head.csv', 'maps.csv']
+
+
+def test_compute_stats_empty():
+    stats = compute_stats([], [Entry(number=1, name='Yossy')])
+    assert stats['standings'].loc['1: Yossy', 'matches'] == 0
+    assert len(stats['maps']) == 0
+
+
+def test_export_stats_parquet(tmp_path, monkeypatch):
+    stats = compute_stats([], [Entry(number=1, name='Yossy')])
+    monkeypatch.setattr(analytics, 'PARQUET_ENGINES', ['no_such_engine'])
+    assert not parquet_available()
+    # Not offered without an engine
+    monkeypatch.setattr(analytics, 'STATS_FORMATS', ['csv'])
+    with pytest.raises(ValueError):
+        export_stats(stats, tmp_path, 'parquet')
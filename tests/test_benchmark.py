@@ -0,0 +1,31 @@
+import os
+import pytest
+import benchmark
+
+
+def test_run_benchmarks():
+    cwd = os.getcwd()
+    results = benchmark.run_benchmarks('small', repeat=1)
+    assert os.getcwd() == cwd
+    assert set(results.keys()) == {
+        'update_obs_view', 'update_obs_view (cached)', 'render_card', 'load_match_log', 'log_match',
+        'suggest_match', 'match_stats', 'generate_obs_config', 'generate_obs_config (cached)'}
+    assert all(msec > 0 for msec in results.values())
+
+
+def test_check_baseline():
+    baseline = {'log_match': 10.0, 'suggest_match': 10.0}
+    results = {'log_match': 14.0, 'suggest_match': 16.0, 'new_benchmark': 100.0}
+    assert benchmark.check_baseline(results, baseline) == {'suggest_match': (16.0, 10.0)}
+    assert benchmark.check_baseline(results, baseline, max_slowdown=2.0) == {}
+
+
+@pytest.mark.skipif('AC6_BENCHMARK' not in os.environ,
+                    reason='Set AC6_BENCHMARK=1 to check the performance against the baseline')
+def test_performance_regression():
+    "Set AC6_BENCHMARK_MAX_SLOWDOWN to change the allowed slowdown"
+    baseline = benchmark.load_baseline()
+    assert baseline is not None, 'Run "python benchmark.py --save-baseline" first'
+    max_slowdown = float(os.environ.get('AC6_BENCHMARK_MAX_SLOWDOWN', benchmark.DEFAULT_MAX_SLOWDOWN))
+    results = benchmark.run_benchmarks(baseline['scale'])
+    assert benchmark.check_baseline(results, baseline['results'], max_slowdown) == {}
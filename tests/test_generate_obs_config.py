@@ -0,0 +1,64 @@
+import json
+import os
+import pytest
+import generate_obs_config as gen
+
+
+@pytest.fixture
+def template(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, 'EXPORT_FILE', str(tmp_path / 'my_obs_config.json'))
+    monkeypatch.setattr(gen, 'CACHE_FILE', str(tmp_path / 'cache.json'))
+    fpath = tmp_path / 'template.json'
+    data = {'sources': [
+        {'settings': {'file': '$player1_text'}},
+        {'settings': {'local_file': '$clock', 'file': ''}},
+        {'nested': [{'settings': {'file': '$cardview_background_image'}}]},
+    ]}
+    fpath.write_text(json.dumps(data), encoding='utf-8')
+    return fpath
+
+
+def test_generate_obs_config(template):
+    result = gen.generate_obs_config(template)
+    assert not result.cached
+    assert result.missing_files == [os.path.abspath('resources/images/neon_background.png')]
+    data = json.load(open(result.export_file, encoding='utf-8'))
+    assert data['sources'][0]['settings']['file'] == os.path.abspath('outputs/texts/player_1.txt')
+    assert data['sources'][1]['settings']['local_file'] == os.path.abspath('outputs/utils/clock.html')
+
+    # Skipped while nothing has changed
+    assert gen.generate_obs_config(template).cached
+    assert not gen.generate_obs_config(template, force=True).cached
+    template.write_text(template.read_text(encoding='utf-8') + '\n', encoding='utf-8')
+    assert not gen.generate_obs_config(template).cached
+
+
+def test_generate_obs_config_unresolved(template):
+    template.write_text(json.dumps({'settings': {'file': '$unknown_key'}}), encoding='utf-8')
+    with pytest.raises(ValueError):
+        gen.generate_obs_config(template)
+
+
+def test_generate_obs_configs(template, tmp_path):
+    other = tmp_path / 'other.json'
+    other.write_text(template.read_text(encoding='utf-8'), encoding='utf-8')
+    results = gen.generate_obs_configs([template, other])
+    assert [r.cached for r in results] == [False, False]
+    assert len(set(r.export_file for r in results)) == 2
+    assert all(os.path.isfile(r.export_file) for r in results)
+    assert all(os.path.dirname(r.export_file) == str(tmp_path) for r in results)
+    assert [r.cached for r in gen.generate_obs_configs([template, other])] == [True, True]
+
+
+def test_templates(tmp_path, monkeypatch):
+    monkeypatch.setattr(gen, 'EXPORT_FILE', str(tmp_path / 'my_obs_config.json'))
+    monkeypatch.setattr(gen, 'CACHE_FILE', str(tmp_path / 'cache.json'))
+    templates = sorted(gen.TEMPLATES_DIR.glob('*.json'))
+    results = gen.generate_obs_configs(templates)
+    assert len(results) == len(templates)
+
+    # The card view template shows the composited cards
+    template = gen.TEMPLATES_DIR / 'yossy_tournaments_v01_cards.json'
+    data = json.load(open(template, encoding='utf-8'))
+    files = [node[key] for node, key in gen.file_references(data)]
+    assert '$card_player1_image' in files and '$card_player2_image' in files
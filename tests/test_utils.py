@@ -1,6 +1,13 @@
 
+import os
+import pytest
 import numpy as np
+from PIL import Image
 from utils import Entry, Match, MatchCoordinator, MatchInfoWriter
+from utils import IMAGE_SIZE, load_image, save_image, normalize_images
+from utils import OBSItems, Station, EloRatings
+from utils import STATIONS_DIR, station_output_root, match_log_path
+from utils import CARD_SIZE, render_card, card_static_layer, card_font_path
 
 
 def test_MatchCoordinator():
@@ -52,6 +59,159 @@ def run_next_match(mc):
     next_match = Match(mu[0], mu[1], 0, 0)
     mc.log_match(next_match)
     print(mc.generate_table())
-   
 
-    
\ No newline at end of file
+
+def test_images(tmp_path):
+    acdir = tmp_path / 'AC'
+    os.makedirs(acdir)
+    Image.new('RGB', (3840, 2160), 'red').save(acdir / '01.jpg')
+    Image.new('RGBA', (640, 360), 'blue').save(acdir / '02.png')
+
+    image = load_image(acdir / '01.jpg', source_type='ac')
+    assert image.width <= IMAGE_SIZE[0] and image.height <= IMAGE_SIZE[1]
+
+    # Only the oversized image is normalized
+    normalized, skipped = normalize_images(acdir, backup_dir=tmp_path / 'originals')
+    assert normalized == [acdir / '01.jpg']
+    assert skipped == []
+    assert Image.open(acdir / '01.jpg').size == (1268, 713)
+    assert Image.open(tmp_path / 'originals' / '01.jpg').size == (3840, 2160)
+
+    save_image(acdir / '02.png', tmp_path / 'out.png')
+    assert Image.open(tmp_path / 'out.png').size == (640, 360)
+
+
+def test_Station(tmp_path, monkeypatch):
+    monkeypatch.setattr('utils.STATIONS_DIR', tmp_path / 'stations')
+    entries = [Entry(number=i+1, name=name) for i, name in enumerate(['Yossy', 'P1', 'P2'])]
+    station_a = Station('A', entries, tmp_path / 'matchlog_A.txt')
+    station_b = Station('B', entries, tmp_path / 'matchlog_B.txt')
+
+    # Each station has its own output files
+    path_a = station_a.writer.obsitems.key_to_item('player1_text')['relative_path']
+    path_b = station_b.writer.obsitems.key_to_item('player1_text')['relative_path']
+    assert path_a == (tmp_path / 'stations' / 'A' / 'texts' / 'player_1.txt').as_posix()
+    assert path_a != path_b
+    assert OBSItems().key_to_item('player1_text')['relative_path'] == 'outputs/texts/player_1.txt'
+
+    station_a.writer.update_text('player1_text', 'Yossy')
+    station_b.writer.update_text('player1_text', 'P1')
+    assert open(path_a, encoding='utf-8').read() == 'Yossy'
+    assert open(path_b, encoding='utf-8').read() == 'P1'
+
+    # Matches are logged per station
+    station_a.match_coordinator.log_match(Match(entries[0], entries[1], 1, 0))
+    assert len(station_a.match_coordinator.matches) == 1
+    assert len(station_b.match_coordinator.matches) == 0
+
+
+def test_render_card():
+    card = render_card('Yossy', 'Hello', 'resources/images/ac_undefined.png', 1, 2)
+    assert card.size == CARD_SIZE
+    assert card.mode == 'RGBA'
+
+    # The static layer is cached and isn't modified by rendering
+    static = card_static_layer(None, 2)
+    assert card_static_layer(None, 2) is static
+    assert card.tobytes() != static.tobytes()
+
+
+def test_render_card_background(tmp_path):
+    background = tmp_path / 'background.png'
+    Image.new('RGBA', (16, 16), 'red').save(background)
+    red = card_static_layer(background, 2)
+    assert card_static_layer(background, 2) is red
+
+    # The cached layer is discarded when the background is updated
+    Image.new('RGBA', (16, 16), 'blue').save(background)
+    os.utime(background, (0, 0))
+    blue = card_static_layer(background, 2)
+    assert blue.getpixel((0, 0)) != red.getpixel((0, 0))
+
+
+def test_render_card_japanese():
+    card = render_card('ヨッシー', 'こんにちは', 'resources/images/ac_undefined.png', 1, 2)
+    assert card.size == CARD_SIZE
+    if card_font_path() is None:
+        pytest.skip('No CJK font found')
+
+    # Glyphs are drawn instead of the same missing-glyph boxes
+    other = render_card('タロウジ', 'こんにちは', 'resources/images/ac_undefined.png', 1, 2)
+    assert card.tobytes() != other.tobytes()
+
+
+def test_match_logfile(tmp_path):
+    entries = [Entry(number=i+1, name=name) for i, name in enumerate(['Yossy', 'P1'])]
+    mc = MatchCoordinator(entries)
+    logfile = tmp_path / 'matchlog.txt'
+    mc.write_match_logfile(Match(entries[0], entries[1], 2, 1, maps=['Xylem, the Floating City', 'LOC Station 31']), logfile)
+    mc.write_match_logfile(Match(entries[1], entries[0], 0, 1), logfile)
+
+    mc.load_match_logfile(logfile)
+    assert len(mc.matches) == 2
+    assert mc.matches[0].maps == ['Xylem, the Floating City', 'LOC Station 31']
+    assert (mc.matches[0].score1, mc.matches[0].score2) == (2, 1)
+    assert mc.matches[1].maps == []
+
+
+def test_EloRatings(tmp_path):
+    entries = [Entry(number=i+1, name=name) for i, name in enumerate(['Yossy', 'P1', 'P2'])]
+    mc = MatchCoordinator(entries)
+    assert mc.ratings.rating(entries[0]) == 1500
+    assert mc.ratings.closeness({entries[0], entries[1]}) == 1
+
+    logfile = tmp_path / 'matchlog.txt'
+    for match in [Match(entries[0], entries[1], 1, 0), Match(entries[0], entries[2], 1, 0)]:
+        mc.log_match(match)
+        mc.write_match_logfile(match, logfile)
+    assert mc.ratings.rating(entries[0]) > 1500 > mc.ratings.rating(entries[1])
+    assert mc.ratings.closeness({entries[1], entries[2]}) > mc.ratings.closeness({entries[0], entries[2]})
+
+    # Incremental ratings equal the ratings recalculated from the whole history
+    recalculated = EloRatings.from_matches(mc.matches)
+    assert recalculated.ratings == mc.ratings.ratings
+
+    # Saved ratings are loaded with the match log
+    mc2 = MatchCoordinator(entries)
+    mc2.load_match_logfile(logfile)
+    assert mc2.ratings.ratings == mc.ratings.ratings
+    assert mc2.ratings.match_count == 2
+
+    # The saved ratings are rebuilt if a score is corrected by hand
+    lines = logfile.read_text(encoding='utf-8').splitlines(keepends=True)
+    lines[0] = lines[0].replace(', 1-0, ', ', 0-1, ')
+    logfile.write_text(''.join(lines), encoding='utf-8')
+    mc2.load_match_logfile(logfile)
+    assert mc2.ratings.rating(entries[0]) < 1500 + EloRatings.k_factor / 2
+    assert mc2.ratings.ratings == EloRatings.from_matches(mc2.matches).ratings
+
+    # Rating closeness is blended into the matchup score
+    base_score = mc.matchup_score({entries[1], entries[2]})
+    mc.rating_weight = 2
+    assert mc.matchup_score({entries[1], entries[2]}) == base_score + 2 * mc.ratings.closeness({entries[1], entries[2]})
+
+
+def test_normalize_images_large(tmp_path):
+    acdir = tmp_path / 'AC'
+    os.makedirs(acdir)
+    # Larger than MAX_IMAGE_PIXELS, but decoded at a reduced scale in draft mode
+    Image.new('RGB', (9000, 5000), 'red').save(acdir / '01.jpg')
+    # Not decodable in draft mode, so it's too large to process
+    Image.new('L', (9000, 5000)).save(acdir / '02.png')
+    (acdir / '03.png').write_text('not an image')
+
+    normalized, skipped = normalize_images(acdir)
+    assert normalized == [acdir / '01.jpg']
+    assert skipped == [acdir / '02.png', acdir / '03.png']
+    assert Image.open(acdir / '01.jpg').size == (1275, 708)
+    # Re-encoded at a high quality (Pillow's default is 75)
+    assert Image.open(acdir / '01.jpg').quantization[0][0] <= 2
+
+
+def test_station_name():
+    assert station_output_root('Station_1-A') == STATIONS_DIR / 'Station_1-A'
+    for name in ['../../x', 'a/b', '', 'A B']:
+        with pytest.raises(ValueError):
+            station_output_root(name)
+        with pytest.raises(ValueError):
+            match_log_path('main', name)
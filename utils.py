@@ -1,29 +1,131 @@
 # Created by Yossy on 2025/02/23
 
 import os 
+import re
+import hashlib
 import json
+import shutil
 from datetime import datetime
 from pathlib import Path
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 import csv
 import pandas as pd
 from collections import namedtuple
+from functools import lru_cache
 import numpy as np
 
 
 
 RESOURCES = Path("resources")
+OUTPUTS = Path("outputs")
+OBS_FILEPATHS = "obsfilepaths.json"
+
+# Output root directory for each station in multi-station mode
+STATIONS_DIR = OUTPUTS / "stations"
+# Station names are used in file paths
+STATION_NAME_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
+# Max size of the images shown on the OBS scene
+IMAGE_SIZE = 1275, 713
+
+# Resampling filter and reducing gap per image source type.
+# A smaller reducing gap lets JPEG draft mode / reduce() do more of the work.
+# (With 1.5, a 4K screenshot is decoded at 1920x1080 instead of full size.)
+RESAMPLE_FILTERS = {
+    'ac': (Image.Resampling.LANCZOS, 1.5),
+    'map': (Image.Resampling.BICUBIC, 1.5),
+    'default': (Image.Resampling.BICUBIC, 2.0),
+}
+
+# Layout of the composited card view (See MatchInfoWriter.update_card)
+CARD_SIZE = 1275, 1000
+CARD_LAYOUT = {
+    'ac': (0, 0),
+    'name': (40, 735),
+    'stars': (835, 730),
+    'comment': (40, 850),
+}
+CARD_STAR_SIZE = 120, 113
+CARD_STAR_SPACING = 20
+CARD_NAME_FONT_SIZE = 64
+CARD_COMMENT_FONT_SIZE = 40
+CARD_TEXT_COLOR = 'white'
+CARD_BACKGROUND_COLOR = 16, 16, 24, 255
+# The card is read from the local disk, so encoding speed matters more than file size.
+CARD_PNG_COMPRESS_LEVEL = 1
+# Font for names and comments. The first CJK system font found is used if it doesn't exist,
+# since Pillow's default font has no Japanese glyphs.
+CARD_FONT = RESOURCES / "fonts" / "card.ttf"
+CARD_FALLBACK_FONTS = [
+    Path(os.environ.get('WINDIR', 'C:/Windows')) / "Fonts" / name for name in ["meiryo.ttc", "msgothic.ttc", "YuGothM.ttc"]
+] + [
+    Path("/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc"),
+    Path("/System/Library/Fonts/Hiragino Sans GB.ttc"),
+    Path("/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"),
+    Path("/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc"),
+    Path("/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc"),
+]
+
+# JPEG quality of the normalized AC images, which are shown full-size on stream
+NORMALIZE_JPEG_QUALITY = 95
+
+# Max # of pixels of a source image after draft mode decoding. (about 8K resolution) 
+# Larger images are rejected before decoding to cap memory usage.
+# JPEG images are decoded at a reduced scale, so only huge ones hit this limit.
+MAX_IMAGE_PIXELS = 7680 * 4320
+
+def is_valid_station_name(station):
+    "Return True if the station name can be used in file paths"
+    return STATION_NAME_PATTERN.fullmatch(station) is not None
+
+
+def station_output_root(station):
+    "Return the output root directory of the station. (None for the default outputs)"
+    if station is None:
+        return OUTPUTS
+    if not is_valid_station_name(station):
+        raise ValueError("Invalid station name {!r}: Use letters, digits, '_' and '-' only.".format(station))
+    return STATIONS_DIR / station
+
+
+@lru_cache
+def _load_obsfilepaths(fpath, mtime):
+    with open(fpath, 'r') as jsonfile:
+        return json.load(jsonfile)
 
-class OBSItems(dict):
 
-    # Load json file for OBS reference file path
-    _data = json.load(open('obsfilepaths.json', 'r'))
+class OBSItems(dict):
 
     IMAGE_STAR_EMPTY = RESOURCES / "images" / "star_empty.png" 
     IMAGE_STAR_FILLED = RESOURCES / "images" / "star_filled_yellow.png"
     IMAGE_BLANK = RESOURCES / "images" / "blank.png"
     IMAGE_MAP_UNDEFINED = RESOURCES / "images" / "map_undefined.png"
 
+    def __init__(self, output_root=OUTPUTS, fpath=OBS_FILEPATHS):
+        """
+        Load json file for OBS reference file path.
+        Paths under the outputs directory are moved under the given output root.
+        """
+        super().__init__()
+        self.output_root = Path(output_root)
+        self._data = {}
+        for key, item in _load_obsfilepaths(fpath, os.path.getmtime(fpath)).items():
+            item = dict(item)
+            relpath = Path(item['relative_path'])
+            if self.output_root != OUTPUTS and relpath.is_relative_to(OUTPUTS):
+                item['relative_path'] = (self.output_root / relpath.relative_to(OUTPUTS)).as_posix()
+            self._data[key] = item
+
+    def init_outputs(self):
+        "Create the output files from the default outputs if they don't exist yet"
+        for item in self.values():
+            fpath = Path(item['relative_path'])
+            default = OUTPUTS / fpath.relative_to(self.output_root) if fpath.is_relative_to(self.output_root) else fpath
+            if not os.path.exists(fpath):
+                os.makedirs(fpath.parent, exist_ok=True)
+                if os.path.isfile(default):
+                    shutil.copyfile(default, fpath)
+
     def __getitem__(self, key):
         "Override dict method"
         return self._data[key]
@@ -69,12 +171,21 @@ class OBSItems(dict):
 class MatchInfoWriter:
     """
     This class updates Match Info by editing files linked to OBS objects. 
+    Give a station name to write to the station's own output files.
     """
-    obsitems = OBSItems()
 
     # Number of game(s) a player should win to win a match. (1 for BO1, 2 for BO3, etc.)    
     games_to_win = 1 
 
+    # Render the card view of each player into one image. (See update_card)
+    render_cards = False
+
+    def __init__(self, station=None):
+        self.station = station
+        self.obsitems = OBSItems(station_output_root(station))
+        if station is not None:
+            self.obsitems.init_outputs()
+
     def set_games_to_win(self, number):
         "Set the number of games to take to win the match"
         self.games_to_win = number
@@ -87,8 +198,6 @@ class MatchInfoWriter:
     def reset_score(self):
         "Reset score by setting all star images empty"
 
-        empty_star = Image.open(self.obsitems.IMAGE_STAR_EMPTY)
-        blank = Image.open(self.obsitems.IMAGE_BLANK)
         player1_stars = [x['relative_path'] for x in self.obsitems.player1_star_items()]
         player2_stars = [x['relative_path'] for x in self.obsitems.player2_star_items()]
 
@@ -96,19 +205,18 @@ class MatchInfoWriter:
         for stars in [player1_stars, player2_stars]:
             for i, star in enumerate(stars):
                 if i < self.games_to_win:
-                    empty_star.save(star)
+                    save_image(self.obsitems.IMAGE_STAR_EMPTY, star, None)
                 else:
-                    blank.save(star)
+                    save_image(self.obsitems.IMAGE_BLANK, star, None)
 
     def set_score(self, score_player1, score_player2):
         self.reset_score()
-        filled_star = Image.open(self.obsitems.IMAGE_STAR_FILLED)
         if (score_player1 > self.games_to_win) or (score_player2 > self.games_to_win):
             raise ValueError("Invalid socer input: Score must be less than {}".format(self.games_to_win))
         for score1 in [x['relative_path'] for x in self.obsitems.player1_star_items()][:score_player1]:
-            filled_star.save(score1)
+            save_image(self.obsitems.IMAGE_STAR_FILLED, score1, None)
         for score2 in [x['relative_path'] for x in self.obsitems.player2_star_items()][:score_player2]:
-            filled_star.save(score2)
+            save_image(self.obsitems.IMAGE_STAR_FILLED, score2, None)
     
     def reset_maps(self):
         map_image_paths = [x['relative_path'] for x in self.obsitems.map_image_items()]
@@ -127,15 +235,173 @@ class MatchInfoWriter:
         with open(fpath, 'w', encoding='utf-8') as txtfile:
             txtfile.write(text)
         
-    def update_image(self, key, image_path, size=None):
+    def update_image(self, key, image_path, size=IMAGE_SIZE, source_type='default'):
         "Update an image on the OBS scene by updating the linked image file"
-
-        size = 1275, 713
         fpath = self.obsitems.key_to_item(key)['relative_path']
-        new_image = Image.open(image_path)
-        if size:
-            new_image.thumbnail(size, Image.Resampling.LANCZOS)
-        new_image.save(fpath)
+        save_image(image_path, fpath, size, source_type)
+
+    def update_card(self, player, name, comment, image_path, score):
+        "Update the composited card view of the player (1 or 2) with a single file swap"
+        fpath = self.obsitems.key_to_item('card_player{}_image'.format(player))['relative_path']
+        background = self.obsitems.key_to_item('cardview_background_image')['relative_path']
+        if not os.path.isfile(background):
+            background = None
+        card = render_card(name, comment, image_path, score, self.games_to_win, background)
+        # Write a temporary file first so that OBS never reads a half-written image
+        tmpfile = fpath + '.tmp'
+        card.save(tmpfile, format='PNG', compress_level=CARD_PNG_COMPRESS_LEVEL)
+        os.replace(tmpfile, fpath)
+
+
+def load_image(image_path, size=IMAGE_SIZE, source_type='default'):
+    "Load an image reduced to fit in the given size"
+    image = Image.open(image_path)
+    resample, reducing_gap = RESAMPLE_FILTERS[source_type]
+    if size:
+        # Decode JPEG images at a reduced scale (no-op for the other formats)
+        image.draft(None, (int(size[0] * reducing_gap), int(size[1] * reducing_gap)))
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise ValueError("Image is too large ({}x{}): {}".format(image.width, image.height, image_path))
+    if size:
+        image.thumbnail(size, resample, reducing_gap)
+    return image
+
+
+def fits_in(image_path, size=IMAGE_SIZE):
+    "Return True if the image doesn't need to be resized to fit in the given size"
+    with Image.open(image_path) as image:
+        return image.width <= size[0] and image.height <= size[1]
+
+
+@lru_cache(maxsize=16)
+def _load_image_cached(image_path, mtime, size, source_type):
+    image = load_image(image_path, size, source_type)
+    image.load()
+    return image
+
+
+def load_image_cached(image_path, size=IMAGE_SIZE, source_type='default'):
+    """
+    Load an image reduced to fit in the given size.
+    The decoded image is shared (e.g. between stations) until the file is modified.
+    Do not modify the returned image.
+    """
+    size = tuple(size) if size else None
+    return _load_image_cached(Path(image_path), os.path.getmtime(image_path), size, source_type)
+
+
+def save_image(image_path, fpath, size=IMAGE_SIZE, source_type='default'):
+    "Save an image reduced to fit in the given size"
+    # Skip decoding if the image can be used as it is
+    if (not size or fits_in(image_path, size)) and \
+            os.path.splitext(image_path)[1].lower() == os.path.splitext(fpath)[1].lower():
+        shutil.copyfile(image_path, fpath)
+        return
+    load_image_cached(image_path, size, source_type).save(fpath)
+
+
+def normalize_images(dirpath, size=IMAGE_SIZE, source_type='ac', backup_dir=None):
+    """
+    Reduce oversized images in the directory to fit in the given size.
+    The original images are copied to the backup directory if given. 
+    Files which can't be processed (e.g. not an image or too large) are skipped.
+    Return the lists of normalized image paths and skipped file paths.
+    """
+    dirpath = Path(dirpath)
+    normalized = []
+    skipped = []
+    for fname in sorted(os.listdir(dirpath)):
+        fpath = dirpath / fname
+        if not os.path.isfile(fpath):
+            continue
+        try:
+            if fits_in(fpath, size):
+                continue
+            with load_image(fpath, size, source_type) as image:
+                image.load()
+                if backup_dir is not None:
+                    os.makedirs(backup_dir, exist_ok=True)
+                    shutil.copyfile(fpath, Path(backup_dir) / fname)
+                if fpath.suffix.lower() in ['.jpg', '.jpeg']:
+                    image.save(fpath, quality=NORMALIZE_JPEG_QUALITY)
+                else:
+                    image.save(fpath)
+        except (ValueError, OSError, Image.DecompressionBombError) as e:
+            print("Skipped {}: {}".format(fpath, e))
+            skipped.append(fpath)
+            continue
+        normalized.append(fpath)
+    return normalized, skipped
+
+
+@lru_cache(maxsize=16)
+def _load_card_layer(image_path, mtime, size, source_type):
+    return load_image_cached(image_path, size, source_type).convert('RGBA')
+
+
+def load_card_layer(image_path, size, source_type='default'):
+    "Load an image as an RGBA layer of the card view"
+    return _load_card_layer(Path(image_path), os.path.getmtime(image_path), tuple(size), source_type)
+
+
+def card_font_path():
+    "Return the font file for the card view, or None if no font supports Japanese"
+    for fpath in [CARD_FONT] + CARD_FALLBACK_FONTS:
+        if os.path.isfile(fpath):
+            return fpath
+    return None
+
+
+@lru_cache(maxsize=4)
+def card_font(size):
+    "Return the font for the card view"
+    fpath = card_font_path()
+    if fpath is not None:
+        return ImageFont.truetype(fpath, size)
+    return ImageFont.load_default(size)
+
+
+def card_star_position(i):
+    "Return the position of the i-th star on the card view"
+    x, y = CARD_LAYOUT['stars']
+    return x + i * (CARD_STAR_SIZE[0] + CARD_STAR_SPACING), y
+
+
+@lru_cache(maxsize=8)
+def _card_static_layer(background_path, mtime, games_to_win):
+    card = Image.new('RGBA', CARD_SIZE, CARD_BACKGROUND_COLOR)
+    if background_path is not None:
+        background = ImageOps.fit(Image.open(background_path).convert('RGBA'), CARD_SIZE)
+        card.alpha_composite(background)
+    empty_star = load_card_layer(OBSItems.IMAGE_STAR_EMPTY, CARD_STAR_SIZE)
+    for i in range(games_to_win):
+        card.alpha_composite(empty_star, card_star_position(i))
+    return card
+
+
+def card_static_layer(background_path, games_to_win):
+    "Return the background and the empty stars, which only change with the match format"
+    if background_path is None:
+        return _card_static_layer(None, None, games_to_win)
+    return _card_static_layer(Path(background_path), os.path.getmtime(background_path), games_to_win)
+
+
+def render_card(name, comment, image_path, score, games_to_win, background_path=None):
+    "Composite the card view of a player into one image"
+    card = card_static_layer(background_path, games_to_win).copy()
+
+    ac_image = load_card_layer(image_path, IMAGE_SIZE, 'ac')
+    x, y = CARD_LAYOUT['ac']
+    card.alpha_composite(ac_image, (x + (IMAGE_SIZE[0] - ac_image.width) // 2, y))
+
+    filled_star = load_card_layer(OBSItems.IMAGE_STAR_FILLED, CARD_STAR_SIZE)
+    for i in range(min(score, games_to_win)):
+        card.alpha_composite(filled_star, card_star_position(i))
+
+    draw = ImageDraw.Draw(card)
+    draw.text(CARD_LAYOUT['name'], name, font=card_font(CARD_NAME_FONT_SIZE), fill=CARD_TEXT_COLOR)
+    draw.multiline_text(CARD_LAYOUT['comment'], comment, font=card_font(CARD_COMMENT_FONT_SIZE), fill=CARD_TEXT_COLOR)
+    return card
 
 
 class Entry:
@@ -184,14 +450,18 @@ class Entry:
     def __hash__(self):
         return hash(tuple(self.__dict__.values()))
 
+# Separator of the map names in the match log file
+MAP_SEPARATOR = ' | '
+
 class Match:
     entry1: Entry
     entry2: Entry
     score1: int
     score2: int
     timestamp: datetime
+    maps: list[str]
 
-    def __init__(self, entry1: Entry, entry2: Entry, score1: int, score2: int, timestamp=None):
+    def __init__(self, entry1: Entry, entry2: Entry, score1: int, score2: int, timestamp=None, maps=None):
         if entry1 == entry2:
             raise ValueError('2 identical entries were given: {} & {}'.format(entry1, entry2))
         self.entry1 = entry1
@@ -202,6 +472,7 @@ class Match:
             self.timestamp = datetime.now().replace(microsecond=0)
         else: 
             self.timestamp = timestamp
+        self.maps = [] if maps is None else list(maps)
     
     def matchup(self):
         return {self.entry1, self.entry2}
@@ -235,6 +506,72 @@ def parse_entries(dirpath: str):
     return entries
 
 
+class EloRatings:
+    """
+    Player ratings updated incrementally by each match. (Elo rating system)
+    Ratings are keyed by the entry number.
+    """
+    initial_rating = 1500
+    k_factor = 32
+
+    def __init__(self, ratings=None, match_count=0, log_hash=None):
+        self.ratings = {} if ratings is None else dict(ratings)
+        self.match_count = match_count
+        # Hash of the match log the ratings were saved with (See match_log_hash)
+        self.log_hash = log_hash
+
+    @classmethod
+    def from_matches(cls, matches: list[Match]):
+        "Return ratings calculated from the match history"
+        ratings = cls()
+        for match in matches:
+            ratings.update(match)
+        return ratings
+
+    def rating(self, entry: Entry):
+        return self.ratings.get(entry.number, self.initial_rating)
+
+    def expected_score(self, entry1: Entry, entry2: Entry):
+        "Return the expected score (win probability) of entry1 against entry2"
+        return 1 / (1 + 10 ** ((self.rating(entry2) - self.rating(entry1)) / 400))
+
+    def update(self, match: Match):
+        "Update the ratings of the 2 players of the match"
+        result = 0.5 if match.score1 == match.score2 else float(match.score1 > match.score2)
+        delta = self.k_factor * (result - self.expected_score(match.entry1, match.entry2))
+        self.ratings[match.entry1.number] = self.rating(match.entry1) + delta
+        self.ratings[match.entry2.number] = self.rating(match.entry2) - delta
+        self.match_count += 1
+
+    def closeness(self, matchup):
+        "Return how even the matchup is expected to be. (1 for even, 0 for one-sided)"
+        entry1, entry2 = list(matchup)
+        return 1 - abs(2 * self.expected_score(entry1, entry2) - 1)
+
+    def save(self, fpath):
+        with open(fpath, 'w', encoding='utf-8') as jsonfile:
+            json.dump({'match_count': self.match_count, 'log_hash': self.log_hash, 'ratings': self.ratings},
+                      jsonfile, indent=4)
+
+    @classmethod
+    def load(cls, fpath):
+        with open(fpath, encoding='utf-8') as jsonfile:
+            data = json.load(jsonfile)
+        ratings = {int(number): rating for number, rating in data['ratings'].items()}
+        return cls(ratings, data['match_count'], data.get('log_hash'))
+
+
+def ratings_path(match_log_file):
+    "Return the ratings file path saved alongside the match log file"
+    return Path(os.path.splitext(match_log_file)[0] + '_ratings.json')
+
+
+def match_log_hash(match_log_file):
+    "Return the hash of the match log contents, which changes when the log is edited by hand"
+    with open(match_log_file, 'rb') as logfile:
+        return hashlib.sha256(logfile.read()).hexdigest()
+
+
 class MatchCoordinator:
 
     matches: list[Match]
@@ -243,9 +580,17 @@ class MatchCoordinator:
     max_wait: int
     max_matchup_count: int
     max_consecutive_match = 3
+    ratings: EloRatings
+    # Incremented whenever the entries or the matches change. (Use it to cache derived tables)
+    version: int
+
+    # Weight of the rating closeness in the matchup score (0 to ignore ratings)
+    rating_weight = 0
 
     def __init__(self, entries: list[Entry]):
         self.matches = []
+        self.ratings = EloRatings()
+        self.version = 0
         self.max_wait = 0
         self.max_matchup_count = 0
         self.update_entries(entries)
@@ -258,15 +603,20 @@ class MatchCoordinator:
             for j, e2 in enumerate(entries[i+1:]):
                 self.matchups.append({e1, e2})
         self._update_max_values()
+        self.version += 1
 
-    def update_matches(self, matches: list[Match]):
+    def update_matches(self, matches: list[Match], ratings=None):
         self.matches = matches
+        self.ratings = EloRatings.from_matches(matches) if ratings is None else ratings
         self._update_max_values()
+        self.version += 1
         
     def log_match(self, match: Match):
         "Log match info"
         self.matches.append(match)
+        self.ratings.update(match)
         self._update_max_values()
+        self.version += 1
 
     def _update_max_values(self):
         # Update max wait
@@ -325,8 +675,10 @@ class MatchCoordinator:
                 previously_played += 1
         if max([self.consecutive_match_count(x) for x in list(matchup)]) >= self.max_consecutive_match:
             return 0
-        else:
-            return total_wait_score + matchup_count_score + never_played - previously_played
+        score = total_wait_score + matchup_count_score + never_played - previously_played
+        if self.rating_weight != 0:
+            score += self.rating_weight * self.ratings.closeness(matchup)
+        return score
     
     def generate_table(self):
         "Return matchup table as a DataFrame object"
@@ -356,12 +708,18 @@ class MatchCoordinator:
         return self.entries[entry_nums.index(entry_num)]
 
     def write_match_logfile(self, match: Match, fpath: str):
+        "Append the match to the match logfile and save the current ratings alongside it"
         with open(fpath, 'a', encoding='utf-8') as logfile:
-            logfile.write('{} vs. {}, {}-{}, {}\n'.format(match.entry1.get_label(), 
-                                                          match.entry2.get_label(), 
-                                                          match.score1,
-                                                          match.score2,
-                                                          match.timestamp))
+            line = '{} vs. {}, {}-{}, {}'.format(match.entry1.get_label(), 
+                                                 match.entry2.get_label(), 
+                                                 match.score1,
+                                                 match.score2,
+                                                 match.timestamp)
+            if len(match.maps) != 0:
+                line += ', ' + MAP_SEPARATOR.join(match.maps)
+            logfile.write(line + '\n')
+        self.ratings.log_hash = match_log_hash(fpath)
+        self.ratings.save(ratings_path(fpath))
     
     def load_match_logfile(self, fpath):
         "Load match info from the match logfile."
@@ -370,13 +728,51 @@ class MatchCoordinator:
             entry1, entry2 = [self.label_to_entry(l) for l in [label1, label2]]
             score1, score2 = [int(x.strip()) for x in line.split(',')[1].split('-')] 
             timestamp = datetime.fromisoformat(line.split(',')[2].strip())
-            return Match(entry1, entry2, score1, score2, timestamp)
+            # Map names may contain commas (e.g. "Xylem, the Floating City")
+            fields = line.split(',', 3)
+            maps = fields[3].strip().split(MAP_SEPARATOR) if len(fields) == 4 else []
+            return Match(entry1, entry2, score1, score2, timestamp, maps)
 
         with open(fpath) as logfile:
             matches = [_line_to_match(line) for line in logfile]
-            self.update_matches(matches)
+
+        # Use the saved ratings only if the match log hasn't been changed since they were saved
+        ratings = None
+        if os.path.isfile(ratings_path(fpath)):
+            ratings = EloRatings.load(ratings_path(fpath))
+            if ratings.match_count != len(matches) or ratings.log_hash != match_log_hash(fpath):
+                ratings = None
+        self.update_matches(matches, ratings)
             
 
+class Station:
+    """
+    A streamed station with its own match coordinator and OBS output files.
+    Stations in the same process share the entry list and decoded images.
+    """
+    name: str
+    writer: MatchInfoWriter
+    match_coordinator: MatchCoordinator
+    match_log_file: Path
+
+    def __init__(self, name, entries: list[Entry], match_log_file):
+        self.name = name
+        self.writer = MatchInfoWriter(station=name)
+        self.match_coordinator = MatchCoordinator(entries)
+        self.match_log_file = Path(match_log_file)
+
+    def __repr__(self):
+        return 'Station({})'.format(self.name)
+
+
+def match_log_path(dirpath, station=None):
+    "Return the match log file path of the station"
+    if station is not None and not is_valid_station_name(station):
+        raise ValueError("Invalid station name {!r}: Use letters, digits, '_' and '-' only.".format(station))
+    fname = 'matchlog.txt' if station is None else 'matchlog_{}.txt'.format(station)
+    return Path(dirpath) / fname
+
+
 Comment = namedtuple('Comment', ['user', 'comment'])
 
 def parse_comments(txtfile):